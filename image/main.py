@@ -1,4 +1,4 @@
-from src.rag_app.query_data import query_rag
+from src.rag_app.query_data import query_rag, query_rag_batch
 import argparse
 
 
@@ -24,8 +24,7 @@ def main():
             "Tell me about marriage clauses and the vocabulary they use"
         ]
         
-        for query in test_queries:
-            query_rag(query)
+        query_rag_batch(test_queries)
 
    
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 import argparse
+import hashlib
+import multiprocessing
 import os
 import shutil
+from pathlib import Path
 
-from langchain.document_loaders.pdf import PyPDFDirectoryLoader
+import pypdfium2 as pdfium
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
 from langchain.vectorstores.chroma import Chroma
@@ -12,6 +15,12 @@ from src.rag_app.get_embedding_function import get_embedding_function
 DATA_PATH = "./src/data/source/"
 BOOK_DB = "./src/data/bookchroma"
 GREEK_DB = "./src/data/greekchroma"
+LOAD_WORKERS = int(os.environ.get("LOAD_DOCUMENTS_NUMBER_OF_THREADS", max(1, (os.cpu_count() or 1) - 1)))
+BATCH_SIZE = 166  # Chroma inserts fastest in batches of roughly 50-250 documents
+ID_LOOKUP_SIZE = 5000  # Keeps the SQL IN-list of an id-restricted get bounded
+# A crash or rolled-back write with these set can corrupt the store, and a re-run won't repair it.
+# So they are only used while filling an empty store, where --reset loses nothing.
+BULK_PRAGMAS = ("journal_mode=OFF", "synchronous=OFF", "temp_store=MEMORY", "locking_mode=EXCLUSIVE")
 
 
 def main():
@@ -28,8 +37,31 @@ def main():
     add_to_greek(documents)
 
 def load_documents():
-    document_loader = PyPDFDirectoryLoader(DATA_PATH)
-    return document_loader.load()
+    # Same glob, filters and path form as PyPDFDirectoryLoader, so "source" and therefore the chunk IDs stay the same.
+    root = Path(DATA_PATH)
+    paths = [
+        str(p) for p in sorted(root.glob("**/[!.]*.pdf"))
+        if p.is_file() and not any(part.startswith(".") for part in p.relative_to(root).parts)
+    ]
+    # PDF parsing is CPU bound, so spread the files over worker processes.
+    with multiprocessing.Pool(LOAD_WORKERS) as pool:
+        documents = pool.map(_load_one_pdf, paths)
+    return [doc for docs in documents for doc in docs]
+
+def _load_one_pdf(path: str):
+    # PDFium extracts text far faster than pypdf; keep the source/page metadata calculate_chunk_ids relies on.
+    # PDFium ends lines with "\r\n" where pypdf used "\n", and the reference cleanup only joins "\n" breaks.
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return [
+            Document(
+                page_content=pdf[i].get_textpage().get_text_range().replace("\r\n", "\n"),
+                metadata={"source": path, "page": i},
+            )
+            for i in range(len(pdf))
+        ]
+    finally:
+        pdf.close()
 
 def split_documents(documents: list[Document]):
     text_splitter = RecursiveCharacterTextSplitter(
@@ -45,29 +77,77 @@ def add_to_book(chunks: list[Document]):
         persist_directory=BOOK_DB, embedding_function=get_embedding_function() #TODO: embedding_function 
     )
     
-    chunks_with_ids = calculate_chunk_ids(chunks)
-
-    # Add or Update the documents.
-    existing_items = book_db.get(include=[])  # IDs are always included by default
-    existing_ids = set(existing_items["ids"])
-    print(f"Number of existing documents in DB: {len(existing_ids)}")
-
-    # Only add documents that don't exist in the DB.
-    new_chunks = []
-    for chunk in chunks_with_ids:
-        if chunk.metadata["id"] not in existing_ids:
-            new_chunks.append(chunk)
-
-    if len(new_chunks):
-        print(f"👉 Adding new documents: {len(new_chunks)}")
-        new_chunk_ids = [chunk.metadata["id"] for chunk in new_chunks]
-        book_db.add_documents(new_chunks, ids=new_chunk_ids)
-        book_db.persist()
-    else:
-        print("✅ No new documents to add")
+    previous_pragmas = _set_pragmas(book_db, BULK_PRAGMAS) if _is_empty(book_db) else ()
+    try:
+        chunks_with_ids = calculate_chunk_ids(chunks)
+
+        # Add or Update the documents.
+        existing_ids = _existing_ids(book_db, [chunk.metadata["id"] for chunk in chunks_with_ids])
+        print(f"Number of chunks already in DB: {len(existing_ids)}")
+
+        # Only add documents that don't exist in the DB, streamed in batches.
+        added, failed = _add_batches(book_db, _new_batches(chunks_with_ids, existing_ids, BATCH_SIZE))
+        if added or failed:
+            print(f"👉 Added new documents: {added}, failed: {failed}")
+        else:
+            print("✅ No new documents to add")
+    finally:
+        _set_pragmas(book_db, previous_pragmas)
+
+def _is_empty(db):
+    return not db.get(limit=1, include=[])["ids"]
+
+def _set_pragmas(db, pragmas):
+    # Best effort: returns the settings it replaced, in reverse order, so passing them back restores the store.
+    try:
+        conn = db._client._server._sysdb._conn_pool.connect()
+    except AttributeError:
+        return ()  # Not a local SQLite-backed client, leave the tuning out
+    previous = []
+    for pragma in pragmas:
+        name = pragma.split("=")[0]
+        previous.append(f"{name}={conn.execute(f'PRAGMA {name}').fetchone()[0]}")
+        conn.execute(f"PRAGMA {pragma}")
+    return tuple(reversed(previous))
+
+def _existing_ids(db, candidate_ids):
+    # Only ask Chroma about the IDs we might add, not every ID it holds.
+    existing = set()
+    for i in range(0, len(candidate_ids), ID_LOOKUP_SIZE):
+        existing.update(db.get(ids=candidate_ids[i:i + ID_LOOKUP_SIZE], include=[])["ids"])  # IDs are always included by default
+    return frozenset(existing)
+
+def _new_batches(chunks, existing_ids, batch_size):
+    batch_ids, batch_docs = [], []
+    for chunk in chunks:
+        if chunk.metadata["id"] in existing_ids:
+            continue
+        batch_ids.append(chunk.metadata["id"])
+        batch_docs.append(chunk)
+        if len(batch_ids) == batch_size:
+            yield batch_ids, batch_docs
+            batch_ids, batch_docs = [], []
+    if batch_ids:
+        yield batch_ids, batch_docs
+
+def _add_batches(db, batches):
+    # Returns how many documents were added and how many were in batches that failed.
+    added = failed = 0
+    for batch_ids, batch_docs in batches:
+        try:
+            # add_documents embeds the whole batch with one embed_documents call.
+            db.add_documents(batch_docs, ids=batch_ids)
+            added += len(batch_ids)
+        except Exception as e:
+            # Keep going so one bad batch doesn't abort the whole ingest.
+            print(f"⚠️ Failed to add batch starting at {batch_ids[0]}: {e}")
+            failed += len(batch_ids)
+    if added:
+        # Persist once at the end, it rewrites the whole index every time.
+        db.persist()
+    return added, failed
+
 def add_to_greek(text: list[Document]):
-    if os.path.exists(GREEK_DB):
-        shutil.rmtree(GREEK_DB)
     greek_db = Chroma(
         persist_directory=GREEK_DB, embedding_function=get_embedding_function() #TODO: embedding_function
     )
@@ -75,16 +155,41 @@ def add_to_greek(text: list[Document]):
     for doc in text:
         content= content + (doc.page_content+" ")
     chunks = greek_text_from_text(content)
-    new_chunks = []
+
+    # Content-hash IDs so re-runs only add clauses that aren't stored yet.
+    greek_chunks = {}
     for chunk in chunks:
-        new_chunks.append(Document(
+        chunk_id = hashlib.sha1(f"{chunk['clause']}|{chunk['text']}".encode()).hexdigest()
+        greek_chunks.setdefault(chunk_id, Document(
             page_content=chunk["text"],
-            metadata={"source": chunk["clause"]}
+            metadata={"source": chunk["clause"], "id": chunk_id}
         ))
-    if len(new_chunks):
-            print(f"👉 Adding new documents: {len(new_chunks)}")
-            greek_db.add_documents(new_chunks)
-            greek_db.persist()
+
+    previous_pragmas = _set_pragmas(greek_db, BULK_PRAGMAS) if _is_empty(greek_db) else ()
+    try:
+        existing_ids = _drop_stale_ids(greek_db, greek_chunks.keys())
+        print(f"Number of greek chunks already in DB: {len(existing_ids)}")
+
+        added, failed = _add_batches(greek_db, _new_batches(greek_chunks.values(), existing_ids, BATCH_SIZE))
+        if added or failed:
+            print(f"👉 Added new greek documents: {added}, failed: {failed}")
+        else:
+            print("✅ No new greek documents to add")
+    finally:
+        _set_pragmas(greek_db, previous_pragmas)
+
+def _drop_stale_ids(db, current_ids):
+    # Delete stored rows the current sources no longer produce (removed PDFs, changed extraction,
+    # UUID rows from before content-hash IDs) so the store keeps matching the sources.
+    # Returns the stored IDs that are kept.
+    stored_ids = db.get(include=[])["ids"]
+    stale_ids = [i for i in stored_ids if i not in current_ids]
+    for i in range(0, len(stale_ids), ID_LOOKUP_SIZE):
+        db.delete(ids=stale_ids[i:i + ID_LOOKUP_SIZE])
+    if stale_ids:
+        db.persist()
+        print(f"🧹 Removed greek documents no longer in the sources: {len(stale_ids)}")
+    return frozenset(stored_ids).intersection(current_ids)
 
 
 def calculate_chunk_ids(chunks):
@@ -1,12 +1,13 @@
 
 
 from src.GTE.clean_text import collect_expanded
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
+import os
+import threading
 import time
 import datetime
 import re
-import roman
-import requests
 import logging
 from lxml import etree
 # Setup logging for errors
@@ -19,6 +20,45 @@ cit_text = ""  # Placeholder for citation text
 processing = False  # Flag to track processing state
 prev_collection = ''  # Variable to store previous collection for continuity
 
+# Citation with one or more line ranges, compiled once at import
+_RANGE_RE = re.compile(r"""
+(?P<base>                                     # Named group 'base'
+    (?:[A-Z][A-Za-z.]*\s){1,2}                # 1 or 2 space-separated parts (before final)
+    \d+\.                                     # Final part: digits followed by dot
+)
+(?P<ranges>                                   # Named group 'ranges'
+    \d+-\d+(?:,\s*\d+-\d+)*                   # One or more ranges, comma-separated
+)
+\s*
+(?P<paren>\([^)]+\))                          # Named group 'paren': parentheses content
+""", re.VERBOSE)
+
+# Space-separated tokens, where a parenthesised group counts as part of the token
+_SPLIT_RE = re.compile(r'(?:[^ (]+|\([^)]*\)|\()+')
+
+_ROMAN = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+# Canonical numerals only, so malformed volumes like "IIII" or "VX" are rejected rather than misread
+_ROMAN_RE = re.compile(r'M{0,3}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})')
+
+# TEI parser and XPath queries, built once and reused for every EpiDoc file
+_NS = {'tei': 'http://www.tei-c.org/ns/1.0'}
+_AB_XPATH = etree.XPath("//tei:div[@type='edition']//tei:ab", namespaces=_NS)
+_LB_XPATH = etree.XPath(".//tei:lb[@n]", namespaces=_NS)
+_parsers = threading.local()  # lxml parsers must not be shared between threads
+
+
+def _get_parser() -> etree.XMLParser:
+    """
+    Returns this thread's TEI parser, creating it on first use.
+
+    Returns:
+        etree.XMLParser: A parser that is only ever used by the calling thread.
+    """
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = _parsers.parser = etree.XMLParser(huge_tree=True, collect_ids=False, resolve_entities=False)
+    return parser
+
 
 def extract(input_text: str) -> tuple[List[Dict[str, str]], List[str]]:
     """
@@ -33,21 +73,10 @@ def extract(input_text: str) -> tuple[List[Dict[str, str]], List[str]]:
     Returns:
         Tuple[List[Dict[str, str]], List[str]]:
             - List[Dict[str, str]]: A list of processed references in a structured format (e.g., {"collection": "P. OXY.", "number": 123, "identifier": "10", "lines": "12"}).
-            - List[str]: A list of raw references in string form (e.g., "P. OXY. 123. 10-12 (AD 100-120);").
-    """
-    range_pattern = r"""
-    (?P<base>                                     # Named group 'base'
-        (?:[A-Z][A-Za-z.]*\s){1,2}                # 1 or 2 space-separated parts (before final)
-        \d+\.                                     # Final part: digits followed by dot
-    )
-    (?P<ranges>                                   # Named group 'ranges'
-        \d+-\d+(?:,\s*\d+-\d+)*                   # One or more ranges, comma-separated
-    )
-    \s*
-    (?P<paren>\([^)]+\))                          # Named group 'paren': parentheses content
+            - List[str]: A list of raw references in string form (e.g., "P. OXY. 123. 10-12 (AD 100-120);"),
+                         aligned index-for-index with the processed references.
     """
-    
-    matches = re.finditer(range_pattern, input_text, re.VERBOSE)
+    matches = _RANGE_RE.finditer(input_text)
     processed_matches = []  # Store the final processed matches
     raw_matches = []  # Store raw extracted citations
     prev_collection = ''  # Variable to store previous collection
@@ -67,30 +96,34 @@ def extract(input_text: str) -> tuple[List[Dict[str, str]], List[str]]:
 
         for r in [s.strip() for s in ranges.split(",")]:
             citation = f"{base}{r} {paren};"  # Build citation string
-            raw_matches.append(citation)  # Add raw match
             processed = process_extracted_text(citation)  # Process citation
 
             if processed:
                 processed_matches.append(processed)  # Add processed match to result
+                raw_matches.append(citation)  # Keep raw match aligned with processed one
 
     return processed_matches, raw_matches
 
 
 
-def extract_greek_lines_from_file(filepath):
-
-    with open(filepath, 'rb') as f:
-        xml_bytes = f.read()
+def extract_greek_lines_from_file(filepath: str) -> str:
+    """
+    Extracts the Greek text lines from the edition section of an EpiDoc XML file.
 
+    Args:
+        filepath (str): Path to the EpiDoc XML file.
+    
+    Returns:
+        str: The extracted lines joined by newlines.
+    """
     # Parse with namespace support
-    tree = etree.fromstring(xml_bytes)
-    ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+    tree = etree.parse(filepath, _get_parser())
 
-    ab_elements = tree.xpath("//tei:div[@type='edition']//tei:ab", namespaces=ns)
+    ab_elements = _AB_XPATH(tree)
 
     greek_lines = []
     for ab in ab_elements:
-        for lb in ab.xpath(".//tei:lb[@n]", namespaces=ns):
+        for lb in _LB_XPATH(ab):
             try:
                 line_num = int(lb.attrib["n"])
             except ValueError:
@@ -98,14 +131,15 @@ def extract_greek_lines_from_file(filepath):
             if line_num:
                 parts = [lb.tail or '']
                 for sib in lb.itersiblings():
+                    if not isinstance(sib.tag, str):
+                        parts.append(sib.tail or '')  # Comment or processing instruction, only the text after it belongs to the line
+                        continue
                     if sib.tag.endswith("lb"):
                         break
                     parts.append(sib.text or '')
                     parts.append(sib.tail or '')
                 greek_lines.append("".join(parts).strip())
-    output = "\n".join(greek_lines)
-    print(output)
-    return output
+    return "\n".join(greek_lines)
 
 def smart_split(text: str) -> List[str]:
     """
@@ -117,28 +151,7 @@ def smart_split(text: str) -> List[str]:
     Returns:
         List[str]: A list of text parts split by spaces, but respecting parentheses.
     """
-    parts = []
-    current = []
-    depth = 0  # Parentheses depth counter
-
-    for char in text:
-        if char == '(':
-            depth += 1
-            current.append(char)
-        elif char == ')':
-            depth -= 1
-            current.append(char)
-        elif char == ' ' and depth == 0:
-            if current:
-                parts.append(''.join(current))  # Add part to the list
-                current = []  # Reset current part
-        else:
-            current.append(char)
-
-    if current:
-        parts.append(''.join(current))
-
-    return parts
+    return _SPLIT_RE.findall(text)  # Single C-level pass instead of a per-character loop
 
 
 def process_extracted_text(input_text: str) -> Optional[Dict[str, str]]:
@@ -170,13 +183,36 @@ def process_extracted_text(input_text: str) -> Optional[Dict[str, str]]:
         else:
             output['collection'] = parts[0].lower()
         try:
-            output['number'] = roman.fromRoman(parts[1])  # Convert Roman numeral to Arabic number
+            output['number'] = _from_roman(parts[1])  # Convert Roman numeral to Arabic number
             output['identifier'] = parts[2].split('.')[0]
             return output
-        except:
+        except (KeyError, IndexError):  # Not a Roman numeral volume, or no identifier part
             return None
     return None
 
+def _from_roman(numeral: str) -> int:
+    """
+    Converts a Roman numeral to an integer with a single pass over a lookup table.
+
+    Args:
+        numeral (str): The Roman numeral to convert (e.g., "XIV").
+    
+    Returns:
+        int: The numeral's value.
+
+    Raises:
+        KeyError: If the numeral is empty or not a canonical uppercase Roman numeral (e.g., "IIII" or "VX").
+    """
+    if not numeral or not _ROMAN_RE.fullmatch(numeral):
+        raise KeyError(numeral)
+    total = 0
+    prev = 0
+    for char in reversed(numeral):
+        value = _ROMAN[char]
+        total += -value if value < prev else value  # Subtract when a smaller digit precedes a larger one
+        prev = value
+    return total
+
 def get_Dir(input_dict: Dict[str, str]) -> str:
     """
     Generates the URL for a papyri reference based on the provided dictionary.
@@ -209,21 +245,45 @@ def scrape_list(dict_list: List[Dict[str, str]], delay: float) -> List[Optional[
 
     Args:
         dict_list (List[Dict[str, str]]): A list of dictionaries, each containing a papyri reference with 'collection', 'number', and 'identifier'.
-        delay (float): The time to wait (in seconds) between each web scraping request.
+        delay (float): The time to wait (in seconds) between each read. When 0, files are read concurrently in a thread pool.
     
     Returns:
         List[Optional[str]]: A list of Greek text for each reference. Each element is the text extracted from a papyrus, or None if an error occurred.
     """
-    output = []
-    for dict in dict_list:
-        try:
-            output.append(extract_greek_lines_from_file(get_Dir(dict)))
-        except:
-            output.append(None)
-        time.sleep(delay)  # Delay between requests
+    paths = [get_Dir(dict) for dict in dict_list]
+    # Stat every path up front so citations without a file never reach the parser
+    found = [i for i, path in enumerate(paths) if os.path.exists(path)]
+    output = [None] * len(dict_list)
+    if delay:
+        for i in found:
+            output[i] = _safe_extract(paths[i])
+            time.sleep(delay)  # Delay between reads
+        return output
+    # Local files need no politeness delay, and lxml releases the GIL while parsing
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        texts = executor.map(_safe_extract, [paths[i] for i in found])
+        for i, text in zip(found, texts):
+            output[i] = text
     return output
 
 
+def _safe_extract(path: str) -> Optional[str]:
+    """
+    Extracts the Greek text of one EpiDoc file, logging and skipping files that cannot be read or parsed.
+
+    Args:
+        path (str): Path to the EpiDoc XML file.
+    
+    Returns:
+        Optional[str]: The extracted lines, or None if the file could not be read or parsed.
+    """
+    try:
+        return extract_greek_lines_from_file(path)
+    except (etree.XMLSyntaxError, OSError) as e:
+        log.debug("skip %s: %s", path, e)
+        return None
+
+
 def greek_text_from_text(input_text: str, delay: float = 0) -> List[Dict[str, str]]:
     """
     Extracts Greek text from the input text by collecting references and scraping the corresponding texts.
@@ -239,10 +299,13 @@ def greek_text_from_text(input_text: str, delay: float = 0) -> List[Dict[str, st
     """
     input_text = " ".join(collect_expanded(input_text))  # Expand all references
     extracted_Dicts, extracted_text = extract(str(input_text))  # Extract references and text
-    unique_dicts = [dict(t) for t in {tuple(d.items()) for d in extracted_Dicts}]
+    # Scrape each papyrus once, keeping first-seen order so runs are deterministic
+    unique_keys = list(dict.fromkeys(tuple(d.items()) for d in extracted_Dicts))
+    scraped = dict(zip(unique_keys, scrape_list([dict(k) for k in unique_keys], delay)))
     output_list = []
 
-    for a, b in zip(extracted_text, scrape_list(unique_dicts, delay)):
+    for a, d in zip(extracted_text, extracted_Dicts):
+        b = scraped[tuple(d.items())]
         if b == '' or b == None:
             continue
         output_list.append({"clause": a, "text": b})  # Pair citation and text
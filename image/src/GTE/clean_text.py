@@ -1,6 +1,48 @@
 
 import re
 import roman
+from functools import lru_cache
+
+# Patterns compiled once at import rather than looked up on every call
+_RANGE_RE = re.compile(r"\.\d+(?:-\d+)?,*(?:\s*\d+(?:-\d+)?)*")  # Line range, e.g. ".25-32, 39-43"
+_NL_RE = re.compile(r'\n\s*')
+_CAP_RE = re.compile(r'[A-Z]+\.?')
+_ROMAN_CHARS = frozenset('IVXLCDM')
+_FLAT_BRACKETS_RE = re.compile(r'(?:[^()\[\]]|\([^()\[\]]*\)|\[[^()\[\]]*\])*')  # Brackets all closed and unnested
+# Full reference starting with a document identifier
+_HEADER_REF_RE = re.compile(r"""
+    ([A-Z]+(?:\.[A-Z]+)*\.?\s+              # Document identifier (P.CAIR.ZEN, BGU, CPR, etc)
+    (?:[IVX]+|[0-9]+)?\s*                   # Volume number (Roman or Arabic)
+    (?:[0-9]+(?:\.[0-9]+)*)                 # Document number
+    (?:\.[0-9]+(?:-[0-9]+)?                 # Line reference range
+    (?:,\s*[0-9]+(?:-[0-9]+)?)*)?           # Additional line references
+    (?:\?)?                                 # Optional question mark
+    \s*(?:\([^()]*\))                       # Date and location in parentheses
+    (?:\s*\[[^]]*\])?)                      # Optional notes in square brackets
+    """, re.VERBOSE)
+# Continuation reference with just a volume and/or document number
+_CONT_REF_RE = re.compile(r"""
+    ((?:[IVX]+\s+)?                         # Optional volume number (Roman numerals)
+    [0-9]+(?:\.[0-9]+)*                     # Document number
+    (?:\.[0-9]+(?:-[0-9]+)?                 # Line reference range
+    (?:,\s*[0-9]+(?:-[0-9]+)?)*)?           # Additional line references
+    (?:\?)?                                 # Optional question mark
+    \s*(?:\([^()]*\))                       # Date and location in parentheses
+    (?:\s*\[[^]]*\])?)                      # Optional notes in square brackets
+    """, re.VERBOSE)
+
+def normalize_text(text):
+    """
+    Joins wrapped lines into one and drops question marks, the clean-up every reference scan starts with.
+    The public entry points normalize once and pass the result to the _norm variants.
+
+    Args:
+        text (str): The raw text
+
+    Returns:
+        str: The normalized text
+    """
+    return _NL_RE.sub(' ', text).replace("?", "")
 
 def extract(input_text):
     """
@@ -13,20 +55,19 @@ def extract(input_text):
     Returns:
         list: List of expanded range references with appropriate dots added
     """
-    pattern = r"\.\d+(?:-\d+)?,*(?:\s*\d+(?:-\d+)?)*"
-    
-    match = re.search(pattern, input_text)
+    match = _RANGE_RE.search(input_text)
     if not match:
         return []
 
     matched_range_text = match.group()  # Extracted range reference, e.g., "25-32, 39-43"
+    prefix, suffix = input_text[:match.start()], input_text[match.end():]
     new_entries = []
     need_dot = False
     
     for r in matched_range_text.split(","):
         # If needed, add a dot to the beginning of the reference
         re_text = "." + r.strip() if need_dot else r.strip()
-        new_entries.append(re.sub(pattern, re_text, input_text))
+        new_entries.append(prefix + re_text + suffix)  # Splice into the matched span rather than re-running the regex
         need_dot = True  # After the first entry, the next ones should have a dot
 
     return new_entries
@@ -47,12 +88,15 @@ def substitute_expanded(text, previous_collection='', previous_volume='', previo
     """
     # Save original text for substitution
     original_text = text
-    text = re.sub(r'\n\s*', ' ', text)
-    text = text.replace("?", "")
+    text = normalize_text(text)
     
     # Get list of references to replace
-    references = extract_papyri_references(original_text)
+    references = _extract_papyri_references_norm(text)
 
+    # References come back in text order, so rebuild the text in one pass with a moving cursor
+    # instead of rescanning and copying the whole string once per reference
+    pieces = []
+    cursor = 0
     for ref in references:
         expanded_refs, previous_collection, previous_volume, previous_identifier = expand(
             ref, previous_collection, previous_volume, previous_identifier
@@ -65,10 +109,17 @@ def substitute_expanded(text, previous_collection='', previous_volume='', previo
             expanded_str = expanded_refs + ";"
         
         # Replace reference in the original text
-        original_text = original_text.replace(ref, expanded_str)
-    
-    return original_text
+        start = original_text.find(ref, cursor)
+        if start == -1:
+            continue  # Split line ranges don't appear verbatim in the text
+        pieces.append(original_text[cursor:start])
+        pieces.append(expanded_str)
+        cursor = start + len(ref)
+
+    pieces.append(original_text[cursor:])
+    return "".join(pieces)
 
+@lru_cache(maxsize=512)
 def is_roman_numeral(s):
     """
     Check if the given string is a valid Roman numeral.
@@ -79,12 +130,29 @@ def is_roman_numeral(s):
     Returns:
         bool: True if the string is a valid Roman numeral, otherwise False
     """
+    # Cheap character check first, so most non-numerals never reach the raising path
+    if not s or not _ROMAN_CHARS.issuperset(s):
+        return False
     try:
         roman.fromRoman(s)
         return True
     except roman.InvalidRomanNumeralError:
         return False
 
+@lru_cache(maxsize=None)
+def _split_words_re(delimiter):
+    """
+    Builds the pattern smart_split uses to find parts when all brackets are flat and closed.
+
+    Args:
+        delimiter (str): The delimiter to split by
+
+    Returns:
+        re.Pattern: Matches a run of non-delimiter characters and whole bracket groups
+    """
+    d = re.escape(delimiter)
+    return re.compile(rf'(?:[^()\[\]{d}]+|\([^()\[\]]*\)|\[[^()\[\]]*\])+')
+
 def smart_split(text, delimiter):
     """
     Splits the input text by the specified delimiter, ensuring that parentheses
@@ -97,6 +165,10 @@ def smart_split(text, delimiter):
     Returns:
         list: List of parts obtained by splitting the text
     """
+    # Common case: every bracket group is closed and unnested, so a single findall yields the parts
+    if _FLAT_BRACKETS_RE.fullmatch(text):
+        return _split_words_re(delimiter).findall(text)
+
     parts = []
     current = []
     depth = 0
@@ -106,7 +178,7 @@ def smart_split(text, delimiter):
         if char == '(' or char == '[':
             depth += 1
             current.append(char)
-        elif char == ')' or char == ']' and depth > 0:
+        elif (char == ')' or char == ']') and depth > 0:
             depth -= 1
             current.append(char)
         elif char == delimiter and depth == 0:
@@ -143,32 +215,34 @@ def expand(text, previous_collection='', previous_volume='', previous_identifier
         bracket = parts.pop()
     
     offset = 1 if "?" in parts else 0
+    n = len(parts) - offset  # Number of parts, not counting a lone question mark
 
-    if len(parts) == 4 + offset:
+    if n == 4:
         # If the reference has 4 parts, update the collection, volume, and identifier
         previous_collection = parts[0]
         previous_volume = parts[1]
         previous_identifier = parts[2].split('.')[0]
         new_clause = text
-    elif len(parts) == 3 + offset and is_roman_numeral(parts[0]):
-        # If it's a Roman numeral volume, create a new reference with the collection
-        previous_volume = parts[0]
-        new_clause = previous_collection + ' ' + text
-    elif len(parts) == 3 + offset:
-        # If the reference has 3 parts, update the collection
-        previous_collection = parts[0]
-        new_clause = text
-    elif len(parts) == 2 + offset:
+    elif n == 3:
+        if is_roman_numeral(parts[0]):
+            # If it's a Roman numeral volume, create a new reference with the collection
+            previous_volume = parts[0]
+            new_clause = f"{previous_collection} {text}"
+        else:
+            # If the reference has 3 parts, update the collection
+            previous_collection = parts[0]
+            new_clause = text
+    elif n == 2:
         # Handle the case where the identifier is missing
         missing_identifier = len(parts[0].split('.')) == 1
         if missing_identifier:
-            new_clause = previous_collection + ' ' + previous_volume + ' ' + previous_identifier + '.' + text
+            new_clause = f"{previous_collection} {previous_volume} {previous_identifier}.{text}"
         else:
             previous_identifier = parts[0].split('.')[0]
-            new_clause = previous_collection + ' ' + previous_volume + ' ' + text
+            new_clause = f"{previous_collection} {previous_volume} {text}"
     else:
         # Default case, append 'Failed' if the format doesn't match
-        new_clause = text + " Failed"
+        new_clause = f"{text} Failed"
 
     return (' '.join(new_clause.split()), previous_collection, previous_volume, previous_identifier)
 
@@ -187,10 +261,22 @@ def collect_expanded(text, previous_collection='', previous_volume='', previous_
     Returns:
         list: All expanded references in a flat list
     """
-    text = re.sub(r'\n\s*', ' ', text)
-    text = text.replace("?", "")
-    
-    references = extract_papyri_references(text)
+    return _collect_expanded_norm(normalize_text(text), previous_collection, previous_volume, previous_identifier)
+
+def _collect_expanded_norm(text, previous_collection='', previous_volume='', previous_identifier=''):
+    """
+    Collects all expanded papyri references from text that has already been through normalize_text.
+
+    Args:
+        text (str): The normalized text with papyri references
+        previous_collection (str): Optional context for expansion
+        previous_volume (str): Optional context for expansion
+        previous_identifier (str): Optional context for expansion
+
+    Returns:
+        list: All expanded references in a flat list
+    """
+    references = _extract_papyri_references_norm(text)
     all_expanded = []
 
     for ref in references:
@@ -216,9 +302,18 @@ def extract_papyri_references(text):
         list: List of extracted papyri references in their original order
     """
     # Clean up text by replacing newlines and removing question marks
-    text = re.sub(r'\n\s*', ' ', text)
-    text = text.replace("?", "")
-    
+    return _extract_papyri_references_norm(normalize_text(text))
+
+def _extract_papyri_references_norm(text):
+    """
+    Extracts papyri references from text that has already been through normalize_text.
+
+    Args:
+        text (str): The normalized input text with papyri references
+
+    Returns:
+        list: List of extracted papyri references in their original order
+    """
     # Split the text by semicolons to process each part
     parts = [p.strip() for p in text.split(';')]
     all_references = []
@@ -226,34 +321,13 @@ def extract_papyri_references(text):
     for i, part in enumerate(parts):
         if not part:  # Skip empty parts
             continue
+        if '(' not in part:  # Both patterns need a date in parentheses, skip the regex scan when there is none
+            continue
             
-        # Detect and extract papyri references based on pattern
-        if i == 0 or re.match(r'[A-Z]+\.?', part):
-            pattern = r"""
-            ([A-Z]+(?:\.[A-Z]+)*\.?\s+              # Document identifier (P.CAIR.ZEN, BGU, CPR, etc)
-            (?:[IVX]+|[0-9]+)?\s*                   # Volume number (Roman or Arabic)
-            (?:[0-9]+(?:\.[0-9]+)*)                 # Document number
-            (?:\.[0-9]+(?:-[0-9]+)?                 # Line reference range
-            (?:,\s*[0-9]+(?:-[0-9]+)?)*)?           # Additional line references
-            (?:\?)?                                 # Optional question mark
-            \s*(?:\([^()]*\))                       # Date and location in parentheses
-            (?:\s*\[[^]]*\])?)                      # Optional notes in square brackets
-            """
-            matches = re.findall(pattern, part, re.VERBOSE)
-            all_references.extend(matches)
-        else:
-            # Handle continuation references (e.g., just volume or document number)
-            pattern = r"""
-            ((?:[IVX]+\s+)?                         # Optional volume number (Roman numerals)
-            [0-9]+(?:\.[0-9]+)*                     # Document number
-            (?:\.[0-9]+(?:-[0-9]+)?                 # Line reference range
-            (?:,\s*[0-9]+(?:-[0-9]+)?)*)?           # Additional line references
-            (?:\?)?                                 # Optional question mark
-            \s*(?:\([^()]*\))                       # Date and location in parentheses
-            (?:\s*\[[^]]*\])?)                      # Optional notes in square brackets
-            """
-            matches = re.findall(pattern, part, re.VERBOSE)
-            all_references.extend(matches)
+        # Detect and extract papyri references based on pattern; continuation parts
+        # (e.g., just volume or document number) use the shorter pattern
+        pattern = _HEADER_REF_RE if i == 0 or _CAP_RE.match(part) else _CONT_REF_RE
+        all_references.extend(pattern.findall(part))
     
     new_references = []
     for reference in all_references:
@@ -265,9 +339,8 @@ def extract_papyri_references(text):
         extracted = extract(ref_with_semicolon)
         
         if extracted:
-            for nref in extracted:
-                if is_balanced(nref):
-                    new_references.append(nref)
+            # extract() only rewrites the digit range, so each entry keeps the brackets already checked above
+            new_references.extend(extracted)
         else:
             new_references.append(ref_with_semicolon)
     
@@ -1,7 +1,10 @@
+from functools import lru_cache
+
 from langchain_community.embeddings.ollama import OllamaEmbeddings
 from langchain_community.embeddings.bedrock import BedrockEmbeddings
 
 
+@lru_cache(maxsize=1)
 def get_embedding_function():
     embeddings = OllamaEmbeddings(model="mxbai-embed-large")
     return embeddings
@@ -1,12 +1,20 @@
 import argparse
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from langchain.vectorstores.chroma import Chroma
 from langchain.prompts import ChatPromptTemplate
+from langchain.schema.document import Document
 from langchain_community.llms.ollama import Ollama
 
 from src.rag_app.get_embedding_function import get_embedding_function
 
 BOOK_DB = "./src/data/bookchroma"
 GREEK_DB = "./src/data/greekchroma"
+RESPONSE_CACHE_SIZE = 256
+
+_responses = OrderedDict()  # query text -> (response, sources), least recently used first
 
 
 PROMPT_TEMPLATE = """
@@ -26,6 +34,7 @@ Based on the above context, answer the following question as precisely and thoro
 
 {question}
 """
+PROMPT = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)  # Parsed once at import
 
 
 def main():
@@ -38,32 +47,84 @@ def main():
 
 
 def query_rag(query_text: str):
-    # Prepare the DB.
+    return query_rag_batch([query_text])[0]
+
+
+def query_rag_batch(query_texts: list[str]):
+    # Only retrieve for queries that haven't been answered recently. Cached answers are copied out
+    # up front because storing new answers below may evict them from _responses mid-batch.
+    cached = {}
+    pending = []
+    for query_text in dict.fromkeys(query_texts):
+        if query_text in _responses:
+            _responses.move_to_end(query_text)
+            cached[query_text] = _responses[query_text]
+        else:
+            pending.append(query_text)
+    retrieved = {}
+    if pending:
+        # Prepare the DB.
+        embedding_function, book_db, greek_db = _get_dbs()
+        # Embed every query once, reuse the vectors for both DBs and search them concurrently.
+        query_embeddings = [embedding_function.embed_query(query_text) for query_text in pending]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            book_future = executor.submit(_search_batch, book_db, query_embeddings, k=5)
+            greek_future = executor.submit(_search_batch, greek_db, query_embeddings, k=5)
+            retrieved = dict(zip(pending, zip(book_future.result(), greek_future.result())))
+
+    model = Ollama(model="llama2")
+    responses = []
+    w = sys.stdout.write  # Write straight to stdout, print() adds a lookup and separator handling per call
+    for query_text in query_texts:
+        w(f"\033[94mQuestion:\033[0m {query_text}\n\033[92mResponse:\033[0m ")
+        sys.stdout.flush()
+        if query_text in cached:
+            response_text, sources = cached[query_text]
+            w(response_text)
+        else:
+            book_results, greek_results = retrieved[query_text]
+            book_context_text = "\n\n---\n\n".join(doc.page_content for doc, _score in book_results)
+            greek_context_text = "\n\n---\n\n".join(doc.page_content for doc, _score in greek_results)
+            prompt = PROMPT.format(book_context=book_context_text,greek_context=greek_context_text, question=query_text)
+
+            # Print tokens as they arrive instead of waiting for the whole answer.
+            chunks = []
+            for token in model.stream(prompt):
+                w(token)
+                sys.stdout.flush()
+                chunks.append(token)
+            response_text = "".join(chunks)
+
+            sources = [f"{doc.metadata.get("source", None)} - Score: {_score}" for doc, _score in greek_results]
+            cached[query_text] = (response_text, sources)  # Repeats later in this batch reuse the answer
+            _responses[query_text] = (response_text, sources)
+            if len(_responses) > RESPONSE_CACHE_SIZE:
+                _responses.popitem(last=False)  # Drop the least recently used answer
+
+        w(f"\n\033[93mSources:\033[0m {sources}\n")
+        sys.stdout.flush()
+        responses.append(response_text)
+    return responses
+
+
+@lru_cache(maxsize=1)
+def _get_dbs():
+    # Opened on first use and kept, so later queries skip reloading the indexes.
     embedding_function = get_embedding_function()
     book_db = Chroma(persist_directory=BOOK_DB, embedding_function=embedding_function)
     greek_db = Chroma(persist_directory=GREEK_DB, embedding_function=embedding_function)
-    # Search the DB.
-    book_results = book_db.similarity_search_with_score(query_text, k=5)
-    greek_results = greek_db.similarity_search_with_score(query_text, k=5)
-
-    book_context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in book_results])
-    greek_context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in greek_results])
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-    prompt = prompt_template.format(book_context=book_context_text,greek_context=greek_context_text, question=query_text)
-    
-
-    model = Ollama(model="llama2")
-    response_text = model.invoke(prompt)
-
-    sources = [f"{doc.metadata.get("source", None)} - Score: {_score}" for doc, _score in greek_results]
-    formatted_response = (
-    f"\033[94mQuestion:\033[0m {query_text}\n"
-    f"\033[92mResponse:\033[0m {response_text}\n"
-    f"\033[93mSources:\033[0m {sources}"
-)
-
-    print(formatted_response)
-    return response_text
+    return embedding_function, book_db, greek_db
+
+
+def _search_batch(db, query_embeddings, k):
+    # One Chroma query for all embeddings; returns (Document, score) lists like similarity_search_with_score.
+    results = db._collection.query(
+        query_embeddings=query_embeddings, n_results=k, include=["documents", "metadatas", "distances"]
+    )
+    return [
+        [(Document(page_content=doc, metadata=metadata or {}), distance) for doc, metadata, distance in zip(docs, metadatas, distances)]
+        for docs, metadatas, distances in zip(results["documents"], results["metadatas"], results["distances"])
+    ]
 
 
 if __name__ == "__main__":